@@ -1,11 +1,30 @@
 import curses
+import os
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
 import time
 import signal
-import re
 import threading
-from typing import Generator, Optional
+import queue
+from collections import deque
+from itertools import islice
+from typing import Generator
+
+try:
+    from orjson import dumps as json_dumps, loads as json_loads
+except ImportError:
+    import json
+    from json import loads as json_loads
+
+    def json_dumps(obj) -> bytes:
+        """Serializes obj to UTF-8 encoded JSON bytes, matching orjson.dumps."""
+        return json.dumps(obj).encode("utf-8")
+
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+# Translation table removing digits from model names, e.g. "llama3.3" -> "llama."
+_DIGIT_STRIP = str.maketrans("", "", "0123456789")
 
 
 class OllamaClient:
@@ -21,8 +40,11 @@ class OllamaClient:
         self.host = host.rstrip("/")
         self.stream = stream
         self.chat_history = []
+        # Reuse one connection across chat turns instead of reconnecting for every request
+        self._session = requests.Session()
+        self._session.mount(self.host, HTTPAdapter(pool_connections=1, pool_maxsize=2))
 
-    def _post(self, endpoint: str, data: dict, stream: bool = False) -> Optional[Generator[dict, None, None]]:
+    def _post(self, endpoint: str, data: dict, stream: bool = False) -> dict | Generator[dict, None, None]:
         """Sends a POST request to the Ollama API.
 
         Args:
@@ -38,25 +60,52 @@ class OllamaClient:
         """
         url = f"{self.host}{endpoint}"
         try:
-            response = requests.post(url, json=data, stream=stream)
+            response = self._session.post(url, data=json_dumps(data), headers=JSON_HEADERS, stream=stream)
             response.raise_for_status()
             if stream:
-                for line in response.iter_lines():
-                    if line:
-                        yield json.loads(line)
-            else:
-                return response.json()
+                return self._iter_ndjson(url, response)
+            return json_loads(response.content)
         except requests.RequestException as e:
             raise RuntimeError(f"Request to {url} failed: {e}")
 
-    def chat(self, msg: str) -> Generator[str, None, None] | str:
+    def _iter_ndjson(self, url: str, response: requests.Response) -> Generator[dict, None, None]:
+        """Decodes a streamed NDJSON response body.
+
+        Args:
+            url: The URL the request was sent to, for error messages.
+            response: The streamed response to read.
+
+        Yields:
+            Each JSON object in the response body.
+
+        Raises:
+            RuntimeError: If reading the response fails.
+        """
+        try:
+            # Split the NDJSON body on raw urllib3 chunks rather than going through iter_lines
+            buf = bytearray()
+            for data in response.raw.stream(4096, decode_content=True):
+                buf += data
+                start = 0
+                while (nl := buf.find(b"\n", start)) != -1:
+                    if nl > start:
+                        yield json_loads(bytes(buf[start:nl]))
+                    start = nl + 1
+                del buf[:start]
+            if buf.strip():
+                yield json_loads(bytes(buf))
+        except (requests.RequestException, Urllib3HTTPError) as e:
+            raise RuntimeError(f"Request to {url} failed: {e}")
+
+    def chat(self, msg: str) -> Generator[str, None, None]:
         """Sends a chat message to the Ollama model and receives a response.
 
         Args:
             msg: The user's message.
 
         Returns:
-            A generator yielding string chunks if streaming, otherwise the complete response string.
+            A generator yielding string chunks of the response. Without streaming it yields the
+            complete response once.
         """
         self.chat_history.append({"role": "user", "content": msg})
         payload = {
@@ -67,11 +116,21 @@ class OllamaClient:
 
         if self.stream:
             return self._streaming_chat_response(payload)
-        else:
-            result = self._post("/api/chat", payload)
-            response = result.get("message", {}).get("content", "[No response]")
-            self.chat_history.append({"role": "assistant", "content": response})
-            return response
+        return self._full_chat_response(payload)
+
+    def _full_chat_response(self, payload: dict) -> Generator[str, None, None]:
+        """Handles non-streaming responses from the chat endpoint.
+
+        Args:
+            payload: The payload for the chat request.
+
+        Yields:
+            The complete assistant's response, once.
+        """
+        result = self._post("/api/chat", payload)
+        response = result.get("message", {}).get("content", "[No response]")
+        self.chat_history.append({"role": "assistant", "content": response})
+        yield response
 
     def _streaming_chat_response(self, payload: dict) -> Generator[str, None, None]:
         """Handles streaming responses from the chat endpoint.
@@ -82,24 +141,28 @@ class OllamaClient:
         Yields:
             String chunks of the assistant's response.
         """
-        response_text = ""
+        parts = []
         for chunk in self._post("/api/chat", payload, stream=True):
             content = chunk.get("message", {}).get("content", "")
-            response_text += content
+            parts.append(content)
             yield content
-        self.chat_history.append({"role": "assistant", "content": response_text})
+        self.chat_history.append({"role": "assistant", "content": "".join(parts)})
 
 
 solarized_colors = [
     (131, 148, 150), (147, 161, 161), (108, 113, 196),
     (42, 161, 152), (38, 139, 210), (211, 54, 130), (133, 153, 0)
 ]
+_N_COLORS = len(solarized_colors)
+# Color pair attributes for the rainbow effect, filled in by init_rainbow_colors
+RAINBOW_ATTRS = []
 
 
 def init_rainbow_colors() -> None:
     """Initializes custom color pairs for rainbow effect using Solarized palette.
     Only applies if the terminal supports changing colors and has enough color capacity.
     """
+    RAINBOW_ATTRS[:] = [curses.color_pair(10 + i) for i in range(_N_COLORS)]
     if not curses.can_change_color() or curses.COLORS < 16:
         return
     for idx, (r, g, b) in enumerate(solarized_colors, start=10):
@@ -118,13 +181,16 @@ def draw_rainbow_name(win, y: int, x: int, name: str, frame: int) -> None:
         frame: An integer representing the current animation frame, used for color shifting.
     """
     for i, ch in enumerate(name):
-        color_idx = 10 + (i + frame) % len(solarized_colors)
         try:
-            win.addstr(y, x + i, ch, curses.color_pair(color_idx))
+            win.addstr(y, x + i, ch, RAINBOW_ATTRS[(i + frame) % _N_COLORS])
         except curses.error:
             pass
 
 
+# Header box lines, keyed by the width they were built for
+_HEADER_CACHE: dict[int, tuple[str, str, str]] = {}
+
+
 def draw_header(win, width: int) -> None:
     """Draws the header banner for the chat interface.
 
@@ -133,19 +199,38 @@ def draw_header(win, width: int) -> None:
         width: The width of the window.
     """
     safe_width = max(10, width - 1)
+    lines = _HEADER_CACHE.get(safe_width)
+    if lines is None:
+        title = " Chatting with Ollama "
+        lines = _HEADER_CACHE[safe_width] = (
+            "╭" + "─" * (safe_width - 2) + "╮",
+            "│" + title.center(safe_width - 2) + "│",
+            "╰" + "─" * (safe_width - 2) + "╯",
+        )
     try:
         win.clear()
         win.attron(curses.color_pair(3))
-        win.addstr(0, 0, "╭" + "─" * (safe_width - 2) + "╮")
-        title = " Chatting with Ollama "
-        win.addstr(1, 0, "│" + title.center(safe_width - 2) + "│")
-        win.addstr(2, 0, "╰" + "─" * (safe_width - 2) + "╯")
+        for y, line in enumerate(lines):
+            win.addstr(y, 0, line)
         win.attroff(curses.color_pair(3))
         win.refresh()
     except curses.error:
         pass
 
 
+# Streamed tokens are coalesced and redrawn at most this often (~30 FPS) ...
+REDRAW_INTERVAL = 1 / 30
+# ... unless this many characters or a newline arrived since the last redraw
+REDRAW_CHARS = 64
+# Display-side messages kept around, well beyond what fits in the history window
+MAX_MESSAGES = 1024
+# Queued by the background producer once a response stream is exhausted
+_STREAM_END = object()
+# Set by the SIGWINCH handler, checked by ChatInterface.draw_layout
+_RESIZED = threading.Event()
+_YOU_PREFIX = "You: "
+
+
 class ChatInterface:
     def __init__(self, stdscr, client: OllamaClient):
         """Initializes the chat interface.
@@ -156,9 +241,11 @@ class ChatInterface:
         """
         self.stdscr = stdscr
         self.client = client
-        self.assistant_name = re.sub(r"\d", "", client.model).capitalize()
-        self.messages = []
+        self.assistant_name = client.model.translate(_DIGIT_STRIP).capitalize()
+        self.messages = deque(maxlen=MAX_MESSAGES)
         self.abort_stream = threading.Event()
+        self._stream_generation = 0 # Bumped for every response, so stale producers stop
+        self._last_size = None # Terminal size the current windows were created for
         self._initialize_chat() # Initial call to set up
 
     def _initialize_chat(self):
@@ -168,10 +255,11 @@ class ChatInterface:
         internal chat history. It then clears the entire curses screen and redraws
         the basic layout.
         """
-        self.messages = []
+        self.messages = deque(maxlen=MAX_MESSAGES)
         self.client.chat_history = [] # Clear client's history as well
-        self.abort_stream = threading.Event()
+        self.abort_stream.set() # Stop any stream still draining in the background
         self.stdscr.clear() # Clear the entire screen
+        self._last_size = None # Force the windows to be recreated
         self.draw_layout() # Redraw the layout
 
     def run(self):
@@ -192,6 +280,8 @@ class ChatInterface:
         while True:
             self.draw_layout()
             user_input = self.get_input()
+            if not user_input and _RESIZED.is_set():
+                continue # The prompt was interrupted by a resize, lay it out again
 
             if user_input.strip().lower() in {"exit", "quit", ":q", ":wq"}:
                 self.show_bye()
@@ -201,51 +291,195 @@ class ChatInterface:
                 continue # Skip processing as a regular message
             
             self.messages.append(("user", user_input))
-            self.abort_stream.set()  # cancel any prior stream
-            self.abort_stream = threading.Event()  # reset abort event
+            # Bump the generation before clearing the abort event, so prior streams never see
+            # a cleared event alongside their own generation
+            self._stream_generation += 1
+            self.abort_stream.clear()  # reset abort event
             self.stream_response(user_input)
 
     def draw_layout(self):
-        """Draws the main layout of the chat interface, including header, history, and input windows."""
+        """Draws the main layout of the chat interface, including header, history, and input windows.
+
+        The windows are only recreated after a terminal resize or when the screen has been
+        invalidated, otherwise the history is just brought up to date.
+        """
+        if _RESIZED.is_set():
+            _RESIZED.clear()
+            try:
+                cols, lines = os.get_terminal_size()
+                curses.resizeterm(lines, cols)
+            except (OSError, curses.error):
+                pass
+            self._drop_resize_keys()
+        elif self.stdscr.getmaxyx() == self._last_size:
+            self.redraw_history()
+            return
         self.stdscr.clear()
-        self.max_y, self.max_x = self.stdscr.getmaxyx()
+        self.max_y, self.max_x = self._last_size = self.stdscr.getmaxyx()
         self.input_height = 3
         self.header_height = 3
+        # History rows in use, none on terminals too short to fit any
+        self.visible_h = max(0, self.max_y - self.input_height - self.header_height - 1)
 
         self.input_win = curses.newwin(self.input_height, self.max_x, self.max_y - self.input_height, 0)
         self.history_win = curses.newwin(self.max_y - self.input_height - self.header_height, self.max_x, self.header_height, 0)
         self.header_win = curses.newwin(self.header_height, self.max_x, 0, 0)
+        self._rendered_rows = [] # The new history window starts out blank
+        self._tail = None # Where append_to_last_assistant continues drawing
 
         draw_header(self.header_win, self.max_x)
         self.redraw_history()
 
-    def redraw_history(self, frame=0):
-        """Redraws the chat history in the history window.
+    def _drop_resize_keys(self) -> None:
+        """Removes the KEY_RESIZE queued by resizeterm from the input queue.
 
-        Args:
-            frame: An integer for animating the assistant's name color.
+        Any other pending keys, such as one pushed back to interrupt a stream or typed
+        ahead by the user, are put back in their original order.
         """
-        self.history_win.clear()
-        y = 0
+        keys = []
+        self.stdscr.nodelay(True)
+        try:
+            while (ch := self.stdscr.getch()) != -1:
+                if ch != curses.KEY_RESIZE:
+                    keys.append(ch)
+        finally:
+            self.stdscr.nodelay(False)
+        for ch in reversed(keys):
+            curses.ungetch(ch)
+
+    def _history_rows(self) -> list:
+        """Lays out the visible chat history as one row per window line.
+
+        Returns:
+            A list of rows, each a tuple of ``(x, text, attr)`` segments. Segments with an
+            ``attr`` of None are drawn with the rainbow effect.
+        """
+        rows = []
         # Only show messages that fit within the history window height
-        for role, text in self.messages[-(self.max_y - self.input_height - self.header_height - 1):]:
+        visible = list(islice(reversed(self.messages), self.visible_h))
+        for role, text in reversed(visible):
+            if isinstance(text, list):
+                # Streaming responses are kept as a list of chunks until they are drawn
+                text = "".join(text)
             lines = text.splitlines()
             if role == "assistant":
-                draw_rainbow_name(self.history_win, y, 0, f"{self.assistant_name}:", frame)
-                y += 1
-                for line in lines:
-                    if y >= self.max_y - self.input_height - self.header_height - 1:
-                        break
-                    self.history_win.addstr(y, 2, line + "\n", curses.color_pair(2))
-                    y += 1
+                rows.append(((0, f"{self.assistant_name}:", None),))
+                rows.extend(((2, line, curses.color_pair(2)),) for line in lines)
+            else:
+                # Prefix and text share a color so each user row is a single write
+                rows.extend(((0, _YOU_PREFIX + line, curses.color_pair(1)),) for line in lines)
+        return rows[:self.visible_h]
+
+    def _draw_row(self, y: int, row: tuple, frame: int) -> None:
+        """Draws a single history row laid out by ``_history_rows``.
+
+        Args:
+            y: The window line to draw the row on.
+            row: The ``(x, text, attr)`` segments making up the row.
+            frame: An integer for animating the assistant's name color.
+        """
+        for x, text, attr in row:
+            if attr is None:
+                draw_rainbow_name(self.history_win, y, x, text, frame)
             else:
-                for line in lines:
-                    if y >= self.max_y - self.input_height - self.header_height - 1:
-                        break
-                    self.history_win.addstr(y, 0, "You: ", curses.color_pair(1))
-                    self.history_win.addstr(line + "\n")
-                    y += 1
+                try:
+                    self.history_win.addstr(y, x, text, attr)
+                except curses.error:
+                    # Long lines may wrap past the bottom of the window
+                    pass
+            # Clear what's left of the line, e.g. the wrapped tail of a longer row above
+            self.history_win.clrtoeol()
+
+    def redraw_history(self, frame=0):
+        """Redraws the chat history in the history window.
+
+        Rows are diffed against what was drawn last time and only the window from the
+        first changed row downwards is rewritten, so streaming into the last message
+        leaves the rest of the history untouched.
+
+        Args:
+            frame: An integer for animating the assistant's name color.
+        """
+        rows = self._history_rows()
+        last_rows = self._rendered_rows
+        start = min(len(rows), len(last_rows))
+        for y, (row, last_row) in enumerate(zip(rows, last_rows)):
+            if row != last_row:
+                start = y
+                break
+
+        # Rows above the damage are still on screen, only the rainbow names need animating
+        for y, row in enumerate(rows[:start]):
+            for x, text, attr in row:
+                if attr is None:
+                    draw_rainbow_name(self.history_win, y, x, text, frame)
+
+        if start < len(rows) or start < len(last_rows):
+            # Clear to the bottom as well, since long lines wrap into the rows below them
+            self.history_win.move(start, 0)
+            self.history_win.clrtobot()
+            for y in range(start, len(rows)):
+                self._draw_row(y, rows[y], frame)
+        self._rendered_rows = rows
+        parts = self._streaming_parts(rows)
+        if parts is None:
+            self._tail = None
+        elif start < len(rows):
+            # The last row was just drawn, so the cursor sits right after the message's text
+            y, x = self.history_win.getyx()
+            self._tail = (parts, y, x) if y < self.visible_h else None
+        elif self._tail is not None and self._tail[0] is not parts:
+            self._tail = None
+        self.history_win.refresh()
+
+    def _streaming_parts(self, rows: list):
+        """Checks whether text streamed onto the last message can be drawn in place.
+
+        Args:
+            rows: The rows that were just drawn by ``redraw_history``.
+
+        Returns:
+            The chunk list of the streaming assistant message, or None if the message's last
+            line isn't the last row on screen.
+        """
+        if not self.messages or not rows or len(rows) >= self.visible_h:
+            return None
+        role, parts = self.messages[-1]
+        last = next((part for part in reversed(parts) if part), "") if isinstance(parts, list) else ""
+        # The text must end mid-line, in the last row, after the assistant's name
+        if role != "assistant" or not last or last[-1].splitlines() != [last[-1]] or rows[-1][0][2] is None:
+            return None
+        return parts
+
+    def append_to_last_assistant(self, new_text: str) -> bool:
+        """Draws text streamed onto the last assistant message without laying out the history.
+
+        Args:
+            new_text: The text added to the message since it was last drawn.
+
+        Returns:
+            False if the text can't simply be appended at the end of what's on screen, in which
+            case a full ``redraw_history`` is needed instead.
+        """
+        if self._tail is None or self._tail[0] is not self.messages[-1][1]:
+            return False
+        if new_text.splitlines() != [new_text]:
+            # Empty or containing line breaks
+            return not new_text
+        parts, y, x = self._tail
+        try:
+            self.history_win.addstr(y, x, new_text, curses.color_pair(2))
+        except curses.error:
+            return False
+        # Keep the last drawn row in sync, so the next full redraw doesn't see it as changed
+        row_x, text, attr = self._rendered_rows[-1][0]
+        self._rendered_rows[-1] = ((row_x, text + new_text, attr),)
+        # Read the cursor back rather than counting characters, wide characters and tabs
+        # take up more than one column
+        y, x = self.history_win.getyx()
+        self._tail = (parts, y, x) if y < self.visible_h else None
         self.history_win.refresh()
+        return True
 
     def get_input(self):
         """Gets user input from the input window.
@@ -254,7 +488,7 @@ class ChatInterface:
             The decoded string entered by the user.
         """
         self.input_win.clear()
-        self.input_win.addstr(0, 0, "You: ", curses.color_pair(1))
+        self.input_win.addstr(0, 0, _YOU_PREFIX, curses.color_pair(1))
         self.input_win.refresh()
         curses.echo()  # Enable echoing of characters for input
         try:
@@ -272,37 +506,63 @@ class ChatInterface:
         Args:
             user_input: The user's input that triggered this response.
         """
-        self.messages.append(("assistant", "")) # Add a placeholder for the assistant's response
+        parts = []
+        self.messages.append(("assistant", parts)) # Placeholder, chunks are joined lazily in redraw_history
         try:
             stream = self.client.chat(user_input)
             frame = 0
-            bot_response = ""
+            last_draw = time.monotonic()
+            pending = 0 # Characters received since the last redraw
+            drawn = 0 # Chunks already on screen
             self.history_win.nodelay(True) # Make getch non-blocking
 
-            if hasattr(stream, '__iter__') and not isinstance(stream, str):
-                for chunk in stream:
-                    if self.abort_stream.is_set():
-                        # If the stream was aborted (e.g., new input), stop processing
+            # Pull chunks off the network in the background so slow redraws don't stall it
+            chunks = queue.SimpleQueue()
+            threading.Thread(
+                target=self._produce_chunks, args=(stream, chunks, self._stream_generation), daemon=True
+            ).start()
+            done = False
+            newline = False
+            while not done:
+                if self.abort_stream.is_set():
+                    # If the stream was aborted (e.g., new input), stop processing
+                    return
+                try:
+                    ch = self.history_win.getch() # Check for user input during streaming
+                    if ch != -1:
+                        # If a key was pressed, interrupt the stream
+                        self.abort_stream.set()
+                        curses.ungetch(ch) # Put the character back into the input buffer
+                        parts.append("\n[interrupted]")
                         return
-                    try:
-                        ch = self.history_win.getch() # Check for user input during streaming
-                        if ch != -1:
-                            # If a key was pressed, interrupt the stream
-                            self.abort_stream.set()
-                            curses.ungetch(ch) # Put the character back into the input buffer
-                            self.messages[-1] = ("assistant", bot_response + "\n[interrupted]")
-                            return
-                    except curses.error:
-                        # No character available, continue streaming
-                        pass
-                    bot_response += chunk
-                    self.messages[-1] = ("assistant", bot_response) # Update the last message
-                    self.redraw_history(frame)
-                    frame += 1
-            else:
-                # If not streaming (e.g., an error or direct non-streaming response)
-                self.messages[-1] = ("assistant", stream)
-                self.redraw_history()
+                except curses.error:
+                    # No character available, continue streaming
+                    pass
+                try:
+                    # Wait for the next chunk, then drain everything that queued up behind it
+                    chunk = chunks.get(timeout=REDRAW_INTERVAL)
+                    while True:
+                        if chunk is _STREAM_END:
+                            done = True
+                            break
+                        if isinstance(chunk, Exception):
+                            raise chunk
+                        parts.append(chunk)
+                        pending += len(chunk)
+                        newline = newline or "\n" in chunk
+                        chunk = chunks.get_nowait()
+                except queue.Empty:
+                    pass
+                now = time.monotonic()
+                if pending and (done or newline or now - last_draw > REDRAW_INTERVAL or pending > REDRAW_CHARS):
+                    # Most batches only extend the last line, which can be drawn without a full redraw
+                    if not self.append_to_last_assistant("".join(parts[drawn:])):
+                        self.redraw_history(frame)
+                        frame += 1
+                    drawn = len(parts)
+                    last_draw = now
+                    pending = 0
+                    newline = False
         except RuntimeError as e:
             if "Failed to establish a new connection" in str(e):
                 # Handle connection refused error
@@ -311,10 +571,33 @@ class ChatInterface:
                 y, x = self.stdscr.getmaxyx()
                 self.stdscr.addstr(y // 2, (x - len(msg)) // 2, msg, curses.color_pair(3) | curses.A_BOLD)
                 self.stdscr.refresh()
-                time.sleep(1)
+                curses.napms(1000)
+                self._last_size = None # The message covered the windows, recreate them
             else:
                 raise
 
+    def _produce_chunks(self, stream, chunks: queue.SimpleQueue, generation: int) -> None:
+        """Drains a response stream into a queue, run on a background thread.
+
+        Any exception raised by the stream is queued for the consumer to re-raise, and
+        ``_STREAM_END`` is always queued last.
+
+        Args:
+            stream: The generator returned by ``OllamaClient.chat``.
+            chunks: The queue read by ``stream_response``.
+            generation: The stream generation this producer belongs to. It stops once a newer
+                response has started.
+        """
+        try:
+            for chunk in stream:
+                if self.abort_stream.is_set() or generation != self._stream_generation:
+                    break
+                chunks.put(chunk)
+        except Exception as e:
+            chunks.put(e)
+        finally:
+            chunks.put(_STREAM_END)
+
     def show_bye(self):
         """Displays a 'bye' message before exiting the application."""
         self.stdscr.clear()
@@ -322,7 +605,7 @@ class ChatInterface:
         y, x = self.stdscr.getmaxyx()
         self.stdscr.addstr(y // 2, (x - len(msg)) // 2, msg, curses.color_pair(3) | curses.A_BOLD)
         self.stdscr.refresh()
-        time.sleep(1)
+        curses.napms(1000)
 
 
 def start_chat_interface():
@@ -342,7 +625,7 @@ def start_chat_interface():
 
 
 if __name__ == "__main__":
-    # Prevent curses from crashing on terminal resize signals
-    signal.signal(signal.SIGWINCH, lambda n, f: None)
+    # Handle terminal resizes ourselves, the layout is rebuilt before the next prompt
+    signal.signal(signal.SIGWINCH, lambda n, f: _RESIZED.set())
     start_chat_interface()
 